@@ -2,24 +2,96 @@ import os
 import streamlit as st
 from datetime import datetime
 from dotenv import load_dotenv
-from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core import Settings
+from llama_index.core.node_parser import SentenceSplitter
 from llama_index.llms.gemini import Gemini
-from llama_index.embeddings.gemini import GeminiEmbedding
-from utils.loader import load_all_documents
+from utils.embed_cache import CachedGeminiEmbedding
+from utils.index_store import file_digest, is_index_current, sync_index
+from utils.loader import file_extension, is_supported
 import fitz  # PyMuPDF
+import hashlib
 import json
-import time
-import streamlit.components.v1 as components
+import shutil
+
+HISTORY_PAGE_SIZE = 20  # chat messages rendered per "Load earlier" step
+PREVIEW_MAX_PAGES = 3  # PDF pages shown in Docs Preview
 
 # Load API Key
 load_dotenv()
 api_key = os.getenv("GOOGLE_API_KEY")
 
-# Configure Gemini LLM and Embeddings
-llm = Gemini(api_key=api_key, model="models/gemini-1.5-flash")
-embed_model = GeminiEmbedding(api_key=api_key)
+# Configure Gemini LLM and Embeddings (built once per process, not on every rerun)
+@st.cache_resource(show_spinner=False)
+def get_models(api_key):
+    llm = Gemini(api_key=api_key, model="models/gemini-1.5-flash")
+    embed_model = CachedGeminiEmbedding(api_key=api_key, embed_batch_size=100, num_workers=4)  # one batch request per 100 uncached chunks, up to 4 in flight
+    return llm, embed_model
+
+llm, embed_model = get_models(api_key)
 Settings.llm = llm
 Settings.embed_model = embed_model
+Settings.node_parser = SentenceSplitter(chunk_size=512, chunk_overlap=20)
+
+def data_fingerprint(folder_path="data"):
+    fingerprint = []
+    if not os.path.isdir(folder_path):
+        return ()
+    for name in os.listdir(folder_path):
+        if is_supported(name):
+            path = os.path.join(folder_path, name)
+            fingerprint.append((name, os.path.getmtime(path), os.path.getsize(path)))
+    return tuple(sorted(fingerprint))
+
+def is_unchanged_upload(file_path, file):
+    # Size is checked first so the hash is only computed for likely duplicates
+    if not os.path.exists(file_path) or os.path.getsize(file_path) != file.size:
+        return False
+    return file_digest(file_path) == hashlib.blake2b(file.getbuffer()).hexdigest()
+
+@st.cache_resource(max_entries=1, show_spinner=False)  # only the current data/ state is useful
+def build_index(file_fingerprint: tuple):
+    # file_fingerprint is only the cache key: any added, removed or touched file forces a resync
+    index = sync_index("data", Settings.node_parser)
+    return index.as_query_engine(streaming=True)
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def has_current_index(file_fingerprint: tuple):
+    # Hash data/ once per fingerprint rather than once per browser session
+    return is_index_current("data", Settings.node_parser)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def preview_pdf(path: str, mtime: float, max_pages: int = PREVIEW_MAX_PAGES):
+    # mtime is part of the cache key so a re-uploaded file is re-read
+    doc = fitz.open(path)
+    pages = []
+    for i in range(min(max_pages, doc.page_count)):
+        # Collect text blocks only until the 1000-character preview budget is filled
+        buf, n = [], 0
+        for block in doc.load_page(i).get_text("blocks"):
+            if block[6] != 0:  # skip image blocks
+                continue
+            buf.append(block[4])
+            n += len(block[4])
+            if n >= 1000:
+                break
+        text = "".join(buf).strip()
+        if text:
+            pages.append((i + 1, text[:1000]))  # Preview first 1000 characters
+    page_count = doc.page_count
+    doc.close()
+    return pages, page_count
+
+def chat_bubble(msg):
+    avatar_emoji = "🧑" if msg["role"] == "user" else "🤖"
+    bubble = st.chat_message(msg["role"], avatar=avatar_emoji)
+    bubble.caption(f"{msg['role'].capitalize()} [{msg['time']}]")
+    return bubble
+
+def render_message(msg):
+    chat_bubble(msg).markdown(msg["content"])
+
+def load_earlier_messages():
+    st.session_state.history_window += HISTORY_PAGE_SIZE
 
 # Streamlit Page Config
 st.set_page_config(page_title="📚 DocBot", layout="wide")
@@ -29,11 +101,20 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
 if "query_engine" not in st.session_state:
-    st.session_state.query_engine = None
+    # Reuse the index from a previous run when data/ hasn't changed since it was persisted;
+    # build_index then only reloads storage/, and every session shares the cached engine
+    fingerprint = data_fingerprint("data")
+    st.session_state.query_engine = build_index(fingerprint) if has_current_index(fingerprint) else None
 
 if "uploaded_filenames" not in st.session_state:
     st.session_state.uploaded_filenames = []
 
+if "saved_uploads" not in st.session_state:
+    st.session_state.saved_uploads = {}
+
+if "history_window" not in st.session_state:
+    st.session_state.history_window = HISTORY_PAGE_SIZE
+
 # Sidebar - Upload Documents
 with st.sidebar:
     st.header("📁 Upload Documents")
@@ -45,26 +126,33 @@ with st.sidebar:
         for file in files:
             file_path = os.path.join("data", file.name)
             new_files.append(file.name)
-            with open(file_path, "wb") as f:
-                f.write(file.read())
+            # Each upload is checked and written once per session, not on every rerun
+            if st.session_state.saved_uploads.get(file.name) == file.file_id:
+                continue
+            if not is_unchanged_upload(file_path, file):
+                file.seek(0)
+                with open(file_path, "wb") as f:
+                    shutil.copyfileobj(file, f, 1024 * 1024)  # 1 MiB chunks keep memory flat
+            st.session_state.saved_uploads[file.name] = file.file_id
 
         if new_files != st.session_state.uploaded_filenames:
             st.session_state.uploaded_filenames = new_files
             st.session_state.chat_history.clear()
+            st.session_state.history_window = HISTORY_PAGE_SIZE
             st.session_state.query_engine = None
             st.warning("🛠️ New files uploaded. Please rebuild index below.")
 
         if st.button("🔁 Rebuild Index"):
             with st.spinner("Building vector index..."):
-                documents = load_all_documents("data")
-                index = VectorStoreIndex.from_documents(documents)
-                st.session_state.query_engine = index.as_query_engine()
+                st.session_state.query_engine = build_index(data_fingerprint("data"))
+                has_current_index.clear()
             st.success("✅ Index built! You can now chat →")
 
     if st.button("🗑️ Clear All & Reset"):
         st.session_state.chat_history.clear()
         st.session_state.query_engine = None
         st.session_state.uploaded_filenames = []
+        st.session_state.history_window = HISTORY_PAGE_SIZE
         st.rerun()
 
 # Tabs UI (Chat is default)
@@ -75,93 +163,59 @@ with tabs[0]:
     st.markdown("<h2 style='color:green;'>💬 Ask Questions</h2>", unsafe_allow_html=True)
 
     chat_container = st.container()
-    scroll_code = """
-    <script>
-    var chatDiv = window.parent.document.querySelector('section.main');
-    if (chatDiv) {
-        chatDiv.scrollTop = chatDiv.scrollHeight;
-    }
-    </script>
-    """
+    with chat_container:
+        # Only the most recent messages are rendered; older ones load on demand
+        load_earlier = st.empty()
+        for msg in st.session_state.chat_history[-st.session_state.history_window:]:
+            render_message(msg)
 
     if st.session_state.query_engine:
         prompt = st.chat_input("Ask something about your documents...")
         if prompt:
             user_time = datetime.now().strftime("%H:%M:%S")
-            st.session_state.chat_history.append({
+            user_msg = {
                 "role": "user",
                 "content": prompt,
                 "time": user_time
-            })
-
-            with st.spinner("🤖 DocBot is thinking..."):
-                time.sleep(0.5)
-                response = st.session_state.query_engine.query(prompt)
-
-            DocBot_time = datetime.now().strftime("%H:%M:%S")
-            st.session_state.chat_history.append({
-                "role": "DocBot",
-                "content": response.response,
-                "time": DocBot_time
-            })
-
-            components.html(scroll_code, height=0)
+            }
+            st.session_state.chat_history.append(user_msg)
+
+            with chat_container:
+                render_message(user_msg)
+                DocBot_time = datetime.now().strftime("%H:%M:%S")
+                DocBot_msg = {
+                    "role": "DocBot",
+                    "content": "",
+                    "time": DocBot_time
+                }
+                with chat_bubble(DocBot_msg):
+                    with st.spinner("🤖 DocBot is thinking..."):
+                        response = st.session_state.query_engine.query(prompt)
+                    # Tokens render as Gemini produces them
+                    DocBot_msg["content"] = st.write_stream(response.response_gen)
+
+            st.session_state.chat_history.append(DocBot_msg)
     else:
         st.warning("⚠️ Please upload documents and click '🔁 Rebuild Index' in the sidebar to enable asking questions.")
 
-    with chat_container:
-        theme = st.get_option("theme.base")
-        user_bg = "#dcf8c6" if theme == "light" else "#2e3b3c"
-        bot_bg = "#f1f0f0" if theme == "light" else "#383232"
-        text_color = "#000000" if theme == "light" else "#ffffff"
-
-        for msg in st.session_state.chat_history:
-            is_user = msg["role"] == "user"
-            avatar_emoji = "🧑" if is_user else "🤖"
-            bg_color = user_bg if is_user else bot_bg
-            align = "flex-end" if is_user else "flex-start"
-
-            st.markdown(f"""
-            <div style='
-                display: flex;
-                justify-content: {align};
-                margin-bottom: 1rem;
-                align-items: flex-start;
-            '>
-              <div style='
-                  background-color: {bg_color};
-                  padding: 1rem;
-                  border-radius: 1rem;
-                  max-width: 85%;
-                  color: {text_color};
-                  box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                  white-space: pre-wrap;
-                  overflow-wrap: break-word;
-              '>
-                <b>{avatar_emoji} {msg["role"].capitalize()} [{msg["time"]}]</b><br>
-                {msg["content"]}
-              </div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        components.html(scroll_code, height=0)
+    # Drawn last so the hidden count includes this turn's messages
+    hidden = len(st.session_state.chat_history) - st.session_state.history_window
+    if hidden > 0:
+        load_earlier.button(f"⬆️ Load earlier messages ({hidden} hidden)", key="load_earlier", on_click=load_earlier_messages)
 
 # --- Docs Preview Tab ---
 with tabs[1]:
     st.subheader("📄 Document Preview")
     for filename in st.session_state.uploaded_filenames:
-        if filename.endswith(".pdf"):
+        if file_extension(filename) == ".pdf":
             path = os.path.join("data", filename)
-            doc = fitz.open(path)
+            pages, page_count = preview_pdf(path, os.path.getmtime(path))
             st.markdown(f"**📘 {filename}**")
-            for page_num, page in enumerate(doc, start=1):
-                text = page.get_text().strip()
-                if text:
-                    st.markdown(f"<b>Page {page_num}</b>", unsafe_allow_html=True)
-                    st.code(text[:1000])  # Preview first 1000 characters
-                if page_num >= 3:
-                    st.info("Preview limited to 3 pages.")
-                    break
+            for page_num, text in pages:
+                st.markdown(f"<b>Page {page_num}</b>", unsafe_allow_html=True)
+                st.code(text)
+            if page_count > PREVIEW_MAX_PAGES:
+                st.info(f"Preview limited to {PREVIEW_MAX_PAGES} pages.")
         else:
             st.markdown(f"📄 *{filename} (preview not supported yet)*")
 
@@ -0,0 +1,103 @@
+# utils/embed_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Awaitable, Callable, List
+
+from llama_index.embeddings.gemini import GeminiEmbedding
+from pydantic import PrivateAttr
+
+
+class EmbedCache:
+    """On-disk store of embedding vectors keyed by a hash of (text, model)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector TEXT NOT NULL)")
+
+    @staticmethod
+    def key(text: str, model: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8") + b"|" + model.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> dict:
+        found = {}
+        with sqlite3.connect(self.path) as conn:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def put_many(self, items: dict):
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in items.items()],
+            )
+
+    def _lookup(self, texts: List[str], model: str):
+        keys = [self.key(text, model) for text in texts]
+        found = self.get_many(keys)
+
+        # Only send each unseen text to the embedder once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        return keys, found, missing
+
+    def get_or_compute_many(self, texts: List[str], model: str,
+                            compute: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, model)
+        if missing:
+            computed = dict(zip(missing.keys(), compute(list(missing.values()))))
+            self.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aget_or_compute_many(self, texts: List[str], model: str,
+                                   acompute: Callable[[List[str]], Awaitable[List[List[float]]]]) -> List[List[float]]:
+        keys, found, missing = self._lookup(texts, model)
+        if missing:
+            computed = dict(zip(missing.keys(), await acompute(list(missing.values()))))
+            self.put_many(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+
+class CachedGeminiEmbedding(GeminiEmbedding):
+    """GeminiEmbedding that skips the API for chunks embedded on a previous build."""
+
+    _cache: EmbedCache = PrivateAttr()
+
+    def __init__(self, cache_path: str = os.path.join(".embedcache", "store.db"), **kwargs):
+        super().__init__(**kwargs)
+        self._cache = EmbedCache(cache_path)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedGeminiEmbedding"
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        # A list `content` makes genai send one batch_embed_contents request instead of one per text
+        return self._model.embed_content(
+            model=self.model_name,
+            content=texts,
+            title=self.title,
+            task_type=self.task_type,
+            request_options=self._request_options,
+        )["embedding"]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._cache.get_or_compute_many(texts, self.model_name, self._embed_batch)
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        # The parent's async path already embeds the whole list in one call
+        return await self._cache.aget_or_compute_many(texts, self.model_name, super()._aget_text_embeddings)
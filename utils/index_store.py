@@ -0,0 +1,121 @@
+# utils/index_store.py
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from llama_index.core import Settings, StorageContext, VectorStoreIndex, load_index_from_storage
+from utils.loader import is_supported, load_documents
+
+STORAGE_DIR = "storage"
+MANIFEST_FILE = "manifest.json"
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def run_async(coro):
+    """Run `coro` on one event loop that lives for the whole process.
+
+    google-generativeai caches its async client process-wide and binds it to the loop it
+    was first used on, so every sync must reuse the same loop rather than a fresh asyncio.run.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="index-sync-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def index_config(node_parser) -> dict:
+    """Settings that shape the stored vectors; changing any of them invalidates the index."""
+    return {
+        "node_parser": type(node_parser).__name__,
+        "chunk_size": getattr(node_parser, "chunk_size", None),
+        "chunk_overlap": getattr(node_parser, "chunk_overlap", None),
+        "embed_model": getattr(Settings.embed_model, "model_name", None),
+    }
+
+
+def load_manifest(node_parser, persist_dir: str = STORAGE_DIR) -> dict:
+    """Return the per-file manifest, or {} if it is missing or was built with other settings."""
+    path = os.path.join(persist_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("config") != index_config(node_parser):
+        return {}
+    return manifest["files"]
+
+
+def save_manifest(files: dict, node_parser, persist_dir: str = STORAGE_DIR):
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump({"config": index_config(node_parser), "files": files}, f, indent=2)
+
+
+def current_digests(folder_path: str) -> dict:
+    return {
+        file_name: file_digest(os.path.join(folder_path, file_name))
+        for file_name in os.listdir(folder_path)
+        if is_supported(file_name)
+    }
+
+
+def has_persisted_index(persist_dir: str = STORAGE_DIR) -> bool:
+    return os.path.exists(os.path.join(persist_dir, "docstore.json"))
+
+
+def is_index_current(folder_path: str, node_parser, persist_dir: str = STORAGE_DIR) -> bool:
+    """True if the persisted index was built from exactly the files in `folder_path` with the current settings."""
+    manifest = load_manifest(node_parser, persist_dir)
+    if not manifest or not has_persisted_index(persist_dir) or not os.path.isdir(folder_path):
+        return False
+    return current_digests(folder_path) == {name: entry["hash"] for name, entry in manifest.items()}
+
+
+def sync_index(folder_path: str, node_parser, persist_dir: str = STORAGE_DIR):
+    """Bring the persisted index in line with `folder_path`, re-embedding only new or changed files."""
+    manifest = load_manifest(node_parser, persist_dir)
+    if manifest and has_persisted_index(persist_dir):
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+        index = load_index_from_storage(storage_context)
+    else:
+        manifest = {}
+        index = VectorStoreIndex(nodes=[])
+
+    current = current_digests(folder_path)
+
+    # Drop files that were removed or whose contents changed
+    for file_name, entry in list(manifest.items()):
+        if current.get(file_name) != entry["hash"]:
+            for doc_id in entry["doc_ids"]:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+            del manifest[file_name]
+
+    # Parse and embed only what the index hasn't seen yet
+    pending = [file_name for file_name in current if file_name not in manifest]
+    parsed = load_documents([os.path.join(folder_path, file_name) for file_name in pending])
+    nodes = []
+    for file_name, documents in zip(pending, parsed):
+        nodes += node_parser.get_nodes_from_documents(documents)
+        manifest[file_name] = {"hash": current[file_name], "doc_ids": [doc.doc_id for doc in documents]}
+
+    # One async insert lets the embed model keep several batches in flight at once
+    if nodes:
+        run_async(index.ainsert_nodes(nodes, show_progress=True))
+
+    index.storage_context.persist(persist_dir=persist_dir)
+    save_manifest(manifest, node_parser, persist_dir)
+    return index
@@ -1,21 +1,41 @@
 # utils/loader.py
 
 import os
-from llama_index.readers.file import PyMuPDFReader, DocxReader
-from llama_index.core import Document
-
-def load_all_documents(folder_path: str):
-    documents = []
-
-    for file_name in os.listdir(folder_path):
-        path = os.path.join(folder_path, file_name)
-        if file_name.endswith(".pdf"):
-            documents += PyMuPDFReader().load(file_path=path)
-        elif file_name.endswith(".docx"):
-            documents += DocxReader().load(file_path=path)
-        elif file_name.endswith(".txt"):
-            with open(path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            documents.append(Document(text=text))
-
-    return documents
+from llama_index.core import Document, SimpleDirectoryReader
+from llama_index.core.readers.base import BaseReader
+from llama_index.readers.file import DocxReader, PyMuPDFReader
+
+class TextReader(BaseReader):
+    """Reads a .txt file as one Document, replacing undecodable bytes instead of failing."""
+
+    def load_data(self, file, extra_info=None, **kwargs):
+        with open(file, "r", encoding="utf-8", errors="replace") as f:
+            return [Document(text=f.read(), metadata=extra_info or {})]
+
+FILE_EXTRACTOR = {".pdf": PyMuPDFReader(), ".docx": DocxReader(), ".txt": TextReader()}
+SUPPORTED_EXTENSIONS = frozenset(FILE_EXTRACTOR)
+
+def file_extension(file_name: str) -> str:
+    return os.path.splitext(file_name)[1].lower()
+
+def is_supported(file_name: str) -> bool:
+    return file_extension(file_name) in SUPPORTED_EXTENSIONS
+
+def _num_workers(file_count: int):
+    return min(8, os.cpu_count() or 1, file_count)
+
+def _reader(**kwargs):
+    # raise_on_error surfaces parse failures instead of recording the file as indexed with no documents
+    return SimpleDirectoryReader(required_exts=sorted(SUPPORTED_EXTENSIONS), file_extractor=FILE_EXTRACTOR,
+                                 raise_on_error=True, **kwargs)
+
+def load_documents(paths):
+    """Parse `paths` across worker processes; returns one document list per path, in order."""
+    if not paths:
+        return []
+
+    by_name = {}
+    for doc in _reader(input_files=paths).load_data(num_workers=_num_workers(len(paths))):
+        by_name.setdefault(doc.metadata["file_name"], []).append(doc)
+
+    return [by_name.get(os.path.basename(path), []) for path in paths]